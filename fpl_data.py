@@ -1,10 +1,19 @@
-import requests
+import asyncio
+import aiohttp
+import numpy as np
+import orjson
+import requests_cache
 import pandas as pd
-import concurrent.futures
+from requests.adapters import HTTPAdapter
 
 # Constants for FPL API
 API_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
 HISTORY_URL = "https://fantasy.premierleague.com/api/element-summary/{}/"
+
+# Shared session: pooled connections so threads reuse TCP/TLS handshakes,
+# backed by a local sqlite cache so repeat runs within an hour skip the network
+SESSION = requests_cache.CachedSession("fpl_cache", backend="sqlite", expire_after=3600)
+SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
 # Team name mapping to help with merges
 TEAM_NAME_MAPPING = {
     'Arsenal': 'ARS', 'Aston Villa': 'AVL', 'Burnley': 'BUR', 'Bournemouth': 'BOU',
@@ -14,13 +23,23 @@ TEAM_NAME_MAPPING = {
     'Sunderland': 'SUN', 'Spurs': 'TOT', 'West Ham': 'WHU', 'Wolves': 'WOL'
 }
 
+# Only the bootstrap fields the model reads; the API ships dozens more
+PLAYER_COLS = [
+    "id", "element_type", "team", "now_cost", "expected_goals",
+    "expected_assists", "form", "minutes", "bonus", "saves", "yellow_cards",
+    "defensive_contribution", "first_name", "second_name",
+    "expected_goals_per_90", "expected_assists_per_90", "saves_per_90",
+]
+TEAM_COLS = ["id", "name"]
+POSITION_COLS = ["id", "singular_name"]
+
 def fetch_api_data():
     """Fetches data from the FPL API."""
-    r = requests.get(API_URL)
-    data = r.json()
-    players = pd.DataFrame(data["elements"])
-    teams = pd.DataFrame(data["teams"])
-    positions = pd.DataFrame(data["element_types"])
+    r = SESSION.get(API_URL)
+    data = orjson.loads(r.content)
+    players = pd.DataFrame.from_records(data["elements"], columns=PLAYER_COLS)
+    teams = pd.DataFrame.from_records(data["teams"], columns=TEAM_COLS)
+    positions = pd.DataFrame.from_records(data["element_types"], columns=POSITION_COLS)
     return players, teams, positions
 
 def load_and_prep_minutes(filepath):
@@ -37,83 +56,85 @@ def load_and_prep_clean_sheets(filepath):
     Loads clean sheet probabilities, standardizes column names, and converts % to floats.
     """
     cs_df = pd.read_csv(filepath)
-    
-    for i in range(1, 7):
-        gw = i + 15
-        opp_col_orig = f"Opp{i}"
-        cs_col_orig = f"CS{i}%"
 
-        # Rename columns to standard format
-        cs_df = cs_df.rename(columns={opp_col_orig: f"Opp{gw}"})
+    # Process CS% Columns (Strip % and convert to float) in one pass
+    cs_cols = [f"CS{i}%" for i in range(1, 7)]
+    str_cols = [c for c in cs_cols if not pd.api.types.is_numeric_dtype(cs_df[c])]
+    if str_cols:
+        cs_df[str_cols] = cs_df[str_cols].apply(lambda s: s.str.rstrip('%')).astype('float32') / 100
 
-        # Process CS% Column (Strip % and convert to float)
-        if cs_df[cs_col_orig].dtype == object:
-            cs_df[cs_col_orig] = cs_df[cs_col_orig].str.rstrip('%').astype(float) / 100
-        
-        cs_df = cs_df.rename(columns={cs_col_orig: f"xClean_sheets{gw}"})
+    # Rename columns to standard format
+    rename_map = {"Team": "team_name"}
+    for i in range(1, 7):
+        gw = i + 15
+        rename_map[f"Opp{i}"] = f"Opp{gw}"
+        rename_map[f"CS{i}%"] = f"xClean_sheets{gw}"
 
-    cs_df = cs_df.rename(columns={"Team": "team_name"})
+    cs_df = cs_df.rename(columns=rename_map)
     return cs_df
 
-def fetch_single_player_history(player_id):
+# Seasons and stats used when averaging a player's history
+HISTORY_SEASONS = {"2022/23", "2023/24", "2024/25"}
+HISTORY_STATS = ["goals_scored", "assists", "bonus", "saves", "yellow_cards"]
+# Weights by number of available seasons (sorted by season; last is most recent)
+SEASON_WEIGHTS = {
+    1: np.array([1.0]),
+    2: np.array([0.35, 0.65]),
+    3: np.array([0.1, 0.25, 0.65]),
+}
+
+def parse_player_history(data, player_id):
     """
-    Worker function to fetch and calculate historical stats for a single player.
+    Calculates weighted historical per-90 stats for a single player
+    from the element-summary API payload.
     """
     try:
-        data = requests.get(HISTORY_URL.format(player_id)).json()
-        past = pd.DataFrame(data["history_past"])
-        # Check if the player has previous season data
-        if past.empty:
-            return 0
-        # Subset the past data for the last three seasons where they played at least 250 minutes
-        past = past[past["season_name"].isin(["2022/23", "2023/24", "2024/25"])]
-        past = past[past["minutes"] > 250]
+        # Keep the last three seasons where they played at least 250 minutes
+        past = [
+            h for h in data["history_past"]
+            if h["season_name"] in HISTORY_SEASONS and h["minutes"] > 250
+        ]
         # Check if the player still has data after the subset
-        if past.empty:
+        if not past:
             return 0
 
-        # Calculate per-90 stats
-        stats = ["goals_scored", "assists", "bonus", "saves", "yellow_cards"]
-        cols = ["g", "a", "b", "s", "y"]
-        
-        for stat, col in zip(stats, cols):
-            past[col] = (past[stat] / past["minutes"]) * 90
-
-        # Weighted average based on number of available seasons
-        n_seasons = past.shape[0]
-        weights = []
-        # Sets weights for past seasons
-        if n_seasons == 1:
-            weights = [1.0]
-        elif n_seasons == 2:
-            weights = [0.35, 0.65]
-        else:
-            # Assuming sorted by season; last entry is most recent
-            weights = [0.1, 0.25, 0.65] 
-
-        final_stats = []
-        for col in cols:
-            val = sum(past[col].iloc[i] * weights[i] for i in range(n_seasons))
-            final_stats.append(val)
-            
-        final_stats.append(player_id)
-        return final_stats
-        
+        # Per-90 stats as a (seasons, stats) matrix, then one weighted average
+        mins = np.array([h["minutes"] for h in past], dtype=np.float64)
+        stats = np.array([[h[s] for s in HISTORY_STATS] for h in past], dtype=np.float64)
+        per90 = stats * (90.0 / mins)[:, None]
+
+        weights = SEASON_WEIGHTS[len(past)]
+        return (weights @ per90).tolist() + [player_id]
+
     except Exception:
         return 0
 
+async def _fetch_single_player_history(session, player_id):
+    """Fetches and parses historical stats for one player on the event loop."""
+    try:
+        async with session.get(HISTORY_URL.format(player_id)) as resp:
+            if resp.status != 200:
+                return 0
+            data = orjson.loads(await resp.read())
+    except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError):
+        return 0
+    return parse_player_history(data, player_id)
+
+async def _fetch_all_player_histories(player_ids):
+    """Fetches every player's history concurrently over a shared connection pool."""
+    connector = aiohttp.TCPConnector(limit=50, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *[_fetch_single_player_history(session, pid) for pid in player_ids]
+        )
+
 def get_player_history(player_ids):
     """
-    Orchestrates threaded fetching of history for all players.
+    Orchestrates async fetching of history for all players.
     """
-    past_list = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_id = {executor.submit(fetch_single_player_history, pid): pid for pid in player_ids}
-        for future in concurrent.futures.as_completed(future_to_id):
-            result = future.result()
-            if result != 0:
-                past_list.append(result)
-    
+    results = asyncio.run(_fetch_all_player_histories(player_ids))
+    past_list = [r for r in results if r != 0]
+
     return pd.DataFrame(past_list, columns=["g", "a", "b", "s", "y", "id"]).set_index("id")
 
 def build_master_dataframe(players, teams, positions, minutes_df, minutes_map, cs_df):
@@ -121,36 +142,33 @@ def build_master_dataframe(players, teams, positions, minutes_df, minutes_map, c
     Merges all separate dataframes into one master player list.
     """
     players['player_id'] = players['id']
-    
-    # 1. Merge Base Data
+
+    # Index each lookup table once so every join takes pandas' fast
+    # merge-on-index path instead of re-hashing key columns per merge
+    positions_idx = positions.set_index("id")[["singular_name"]]
+    teams_idx = teams.set_index("id")[["name"]]
+    minutes_idx = minutes_df.set_index("player_id")[list(minutes_map.values())]
+
+    # 1. Join Base Data + Minutes
     players_full = (
         players
-        .merge(positions[["id", "singular_name"]], left_on="element_type", right_on="id", how="left")
-        .merge(teams[["id", "name"]], left_on="team", right_on="id", suffixes=("", "_team"))
-    )
-
-    # 2. Merge Minutes
-    players_full = players_full.merge(
-        minutes_df[["player_id"] + list(minutes_map.values())], 
-        on="player_id", 
-        how="left", 
-        validate="1:1"
+        .join(positions_idx, on="element_type")
+        .join(teams_idx, on="team")
+        .join(minutes_idx, on="player_id")
     )
 
-    # 3. Clean Team Names & Positions
+    # 2. Clean Team Names & Positions
     players_full["short_team_name"] = players_full["name"].map(TEAM_NAME_MAPPING)
     players_full = players_full.rename(columns={"singular_name": "position", "name": "team_name"})
 
-    # 4. Merge Clean Sheet Data
-    cs_cols_to_merge = ["team_name"]
+    # 3. Map Clean Sheet Data onto players; with only 20 teams each column
+    # is a cheap dict-style lookup rather than a join
+    cs_cols = []
     for gw in range(16, 22):
-        cs_cols_to_merge.extend([f"Opp{gw}", f"xClean_sheets{gw}", f"x2_{gw}", f"x4_{gw}"])
+        cs_cols.extend([f"Opp{gw}", f"xClean_sheets{gw}", f"x2_{gw}", f"x4_{gw}"])
+
+    cs_idx = cs_df.set_index("team_name")[cs_cols]
+    for col in cs_cols:
+        players_full[col] = players_full["team_name"].map(cs_idx[col])
 
-    players_full = players_full.merge(
-        cs_df[cs_cols_to_merge], 
-        on="team_name", 
-        how="left", 
-        validate="many_to_one"
-    )
-    
     return players_full
\ No newline at end of file
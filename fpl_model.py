@@ -1,6 +1,8 @@
+import math
+import numba
 import numpy as np
 import pandas as pd
-from scipy.stats import poisson
+from scipy.special import gammainc
 # Helps account for playing easy teams vs hard teams
 DIFFICULTY_MAP = {
     # Tier 1 (Hardest - 0.85)
@@ -14,22 +16,36 @@ DIFFICULTY_MAP = {
     # Tier 5 (Target - 1.20)
     'LEE': 1.20, 'WHU': 1.20, 'WOL': 1.20, 'BUR': 1.20
 }
+# Fixed categorical dtype for opponent columns so the difficulty lookup is a
+# C-level integer gather instead of a per-cell dict probe
+OPP_DTYPE = pd.CategoricalDtype(list(DIFFICULTY_MAP.keys()))
+# Last slot is the 1.0 fallback; unmapped opponents get category code -1
+OPP_MULTIPLIERS = np.array([DIFFICULTY_MAP[c] for c in OPP_DTYPE.categories] + [1.0])
+
+@numba.njit(fastmath=True, cache=True)
+def _opp_goal_probs(cs):
+    # Single fused loop: each element's Poisson terms stay in registers
+    # instead of materializing six intermediate arrays
+    p23 = np.empty_like(cs)
+    p4plus = np.empty_like(cs)
+    for i in range(cs.size):
+        lam = -math.log(cs[i])
+        p0 = math.exp(-lam)
+        p1 = lam * p0
+        p2 = (lam**2) * p0 / 2
+        p3 = (lam**3) * p0 / 6
+        # p23 = Prob of conceding exactly 2 or 3 goals
+        p23[i] = p2 + p3
+        # p4plus = Prob of conceding 4 or more
+        p4plus[i] = 1 - (p0 + p1 + p2 + p3)
+    return p23, p4plus
 
 def calculate_opp_goal_probs(cs_prob):
     """
-    Computes opponent goal probabilities (2-3 goals, 4+ goals) 
+    Computes opponent goal probabilities (2-3 goals, 4+ goals)
     derived from the team's clean sheet probability using Poisson.
     """
-    lam = -np.log(cs_prob)
-    p0 = np.exp(-lam)
-    p1 = lam * p0
-    p2 = (lam**2) * p0 / 2
-    p3 = (lam**3) * p0 / 6
-    # p23 = Prob of conceding exactly 2 or 3 goals
-    p23 = p2 + p3
-    # p4plus = Prob of conceding 4 or more
-    p4plus = 1 - (p0 + p1 + p2 + p3)
-    return p23, p4plus
+    return _opp_goal_probs(np.asarray(cs_prob, dtype=np.float64))
 
 def prepare_data_for_modeling(df):
     """
@@ -61,7 +77,14 @@ def prepare_data_for_modeling(df):
     ]
     choices = [1.1, 1, 0.9]
     df['form_multiplier'] = np.select(conditions, choices, default=0.8)
-    
+
+    # Shrink dtypes: float32 halves the footprint of the per-GW arithmetic,
+    # and categorical strings turn position/team filters into integer compares
+    float_cols = df.select_dtypes(include="float64").columns
+    df[float_cols] = df[float_cols].astype("float32")
+    for col in ["position", "team_name", "short_team_name"]:
+        df[col] = df[col].astype("category")
+
     return df
 
 def fill_missing_history_with_current(df):
@@ -73,51 +96,54 @@ def fill_missing_history_with_current(df):
     df["y"] = df["y"].fillna(df["yellow_cards_per_90"])
     return df
 
-def compute_gw_points(df, weights, gw=16):
+def compute_gw_points(df, weights, gws):
     """
-    Calculates expected points for a specific gameweek based on position weights.
-    
+    Calculates expected points for all gameweeks at once based on position weights.
+
     weights: dict containing {goal, assist, cs, save, def_weight, defcon1, defcon2}
     """
-    # Unpack column names for the specific GW
-    xmin_col = f"xMin{gw}"
-    cs_col = f"xClean_sheets{gw}"
-    x2_col = f"x2_{gw}"
-    x4_col = f"x4_{gw}"
-    opp_col = f"Opp{gw}"
+    # Stack the per-GW columns into (players, gameweeks) matrices
+    xmin = df[[f"xMin{gw}" for gw in gws]].to_numpy(dtype=np.float64)
+    cs = df[[f"xClean_sheets{gw}" for gw in gws]].to_numpy(dtype=np.float64)
+    x2 = df[[f"x2_{gw}" for gw in gws]].to_numpy(dtype=np.float64)
+    x4 = df[[f"x4_{gw}" for gw in gws]].to_numpy(dtype=np.float64)
+    p10 = df[[f"p_10_{gw}" for gw in gws]].to_numpy(dtype=np.float64)
+    p12 = df[[f"p_12_{gw}" for gw in gws]].to_numpy(dtype=np.float64)
 
     # Fixture Difficulty
-    df["fixture_mult"] = df[opp_col].map(DIFFICULTY_MAP).fillna(1.0)
-
-    # Defensive calculations (Prob of conceding 0 or 1, etc.)
-    df["lambda_def"] = df["def_contrib_per90"] * (1 - 0.5 * df[cs_col])
-    df["p_10"] = 1 - poisson.cdf(9, df["lambda_def"])
-    df["p_12"] = 1 - poisson.cdf(11, df["lambda_def"])
+    fixture_mult = np.column_stack(
+        [OPP_MULTIPLIERS[df[f"Opp{gw}"].cat.codes] for gw in gws]
+    )
 
     # Offensive Component
-    # Weighted average of Historical (30%) and Expected (70%)
-    offensive_points = (
-        (df["expected_goals_per_90"]*0.7 + df["g"]*0.3) * df["form_multiplier"] * df["fixture_mult"] * weights['goal'] +
-        (df["bonus_per_90"]*0.7 + df["b"]*0.3) * df["form_multiplier"] * df["fixture_mult"] +
-        (df["expected_assists_per_90"]*0.7 + df["a"]*0.3) * df["form_multiplier"] * df["fixture_mult"] * weights['assist']
-    ) * (df[xmin_col] / 90)
+    # Weighted average of Historical (30%) and Expected (70%); the form and
+    # fixture multipliers factor out of the per-stat sum
+    off_per90 = (
+        (df["expected_goals_per_90"]*0.7 + df["g"]*0.3) * weights['goal'] +
+        (df["bonus_per_90"]*0.7 + df["b"]*0.3) +
+        (df["expected_assists_per_90"]*0.7 + df["a"]*0.3) * weights['assist']
+    ).to_numpy(dtype=np.float64)
+    form = df["form_multiplier"].to_numpy(dtype=np.float64)
+    offensive_points = (off_per90 * form)[:, None] * fixture_mult * (xmin / 90)
 
     # Defensive Component
+    save_points = ((df["saves_per_90"]*0.5 + df["s"]*0.5) * weights['save']).to_numpy(dtype=np.float64)
     defensive_points = (
-        df[cs_col] * weights['cs'] +
-        (df["saves_per_90"]*0.5 + df["s"]*0.5) * weights['save'] -
-        df[x2_col] * weights['def'] -
-        2 * df[x4_col] * weights['def'] +
-        2 * df["p_10"] * weights['defcon1'] +
-        2 * df["p_12"] * weights['defcon2']
+        cs * weights['cs'] +
+        save_points[:, None] -
+        x2 * weights['def'] -
+        2 * x4 * weights['def'] +
+        2 * p10 * weights['defcon1'] +
+        2 * p12 * weights['defcon2']
     )
 
     # Final Sum
-    df[f"expected_points{gw}"] = (
+    yellow_points = (df["yellow_cards_per_90"]*0.3 + df["y"]*0.7).to_numpy(dtype=np.float64)
+    df[[f"expected_points{gw}" for gw in gws]] = (
         2 + # Base appearance points (assuming 60 mins played)
         offensive_points +
         defensive_points -
-        (df["yellow_cards_per_90"]*0.3 + df["y"]*0.7)
+        yellow_points[:, None]
     )
     return df
 
@@ -125,11 +151,30 @@ def run_projections(players_df):
     """
     Iterates through GW 16-21 and calculates points for all positions.
     """
-    # Split by position
-    keepers = players_df[players_df["position"] == "Goalkeeper"].copy()
-    defenders = players_df[players_df["position"] == "Defender"].copy()
-    midfielders = players_df[players_df["position"] == "Midfielder"].copy()
-    forwards = players_df[players_df["position"] == "Forward"].copy()
+    gws = list(range(16, 22))
+
+    # Convert opponent columns to the fixed categorical dtype once
+    for gw in gws:
+        players_df[f"Opp{gw}"] = players_df[f"Opp{gw}"].astype(OPP_DTYPE)
+
+    # Defensive contribution tail probabilities (prob of reaching 10/12
+    # defensive actions), computed for every player and gameweek at once.
+    # 1 - poisson.cdf(k - 1, lam) is the regularized gammainc(k, lam).
+    cs_mat = players_df[[f"xClean_sheets{gw}" for gw in gws]].to_numpy(dtype=np.float64)
+    lambda_mat = players_df["def_contrib_per90"].to_numpy(dtype=np.float64)[:, None] * (1 - 0.5 * cs_mat)
+    p10_mat = gammainc(10, lambda_mat)
+    p12_mat = gammainc(12, lambda_mat)
+    for k, gw in enumerate(gws):
+        players_df[f"p_10_{gw}"] = p10_mat[:, k]
+        players_df[f"p_12_{gw}"] = p12_mat[:, k]
+
+    # Split by position in a single groupby pass instead of four mask scans
+    groups = {name: g for name, g in players_df.groupby("position", observed=True, sort=False)}
+    empty = players_df.iloc[0:0]
+    keepers = groups.get("Goalkeeper", empty)
+    defenders = groups.get("Defender", empty)
+    midfielders = groups.get("Midfielder", empty)
+    forwards = groups.get("Forward", empty)
 
     # Define Position-Specific Weights
     # Structure: goal, assist, cs, save, def, defcon1, defcon2
@@ -137,22 +182,19 @@ def run_projections(players_df):
     w_mid = {'goal': 5, 'assist': 3, 'cs': 1, 'save': 0, 'def': 0, 'defcon1': 0, 'defcon2': 1}
     w_def = {'goal': 6, 'assist': 3, 'cs': 4, 'save': 0, 'def': 1, 'defcon1': 1, 'defcon2': 0}
     w_gk  = {'goal': 0, 'assist': 0, 'cs': 4, 'save': 1/3., 'def': 0, 'defcon1': 1, 'defcon2': 0}
-    # Computes points for each position and week
-    for gw in range(16, 22):
-        forwards = compute_gw_points(forwards, w_fwd, gw)
-        midfielders = compute_gw_points(midfielders, w_mid, gw)
-        defenders = compute_gw_points(defenders, w_def, gw)
-        keepers = compute_gw_points(keepers, w_gk, gw)
-
-    # Merge back to master dataframe
+    # Computes points for each position, all weeks at once
+    forwards = compute_gw_points(forwards, w_fwd, gws)
+    midfielders = compute_gw_points(midfielders, w_mid, gws)
+    defenders = compute_gw_points(defenders, w_def, gws)
+    keepers = compute_gw_points(keepers, w_gk, gws)
+
+    # Merge back to master dataframe in one pass; the positional frames
+    # partition the players, so a single concat + join realigns by index
     players_df["total_expected_points"] = 0
-    for gw in range(16, 22):
-        col = f"expected_points{gw}"
-        players_df.loc[forwards.index, col] = forwards[col]
-        players_df.loc[midfielders.index, col] = midfielders[col]
-        players_df.loc[defenders.index, col] = defenders[col]
-        players_df.loc[keepers.index, col] = keepers[col]
-        
+    point_cols = [f"expected_points{gw}" for gw in gws]
+    all_positions = pd.concat([keepers, defenders, midfielders, forwards])[point_cols]
+    players_df = players_df.join(all_positions)
+
     return players_df
 
 def apply_decay(df, decay_rate=0.92):
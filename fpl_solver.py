@@ -1,99 +1,174 @@
-import pulp
+import os
+import highspy
+import numpy as np
 import pandas as pd
+from collections import defaultdict
 
-def solve_fpl_team(df_input, mode="wildcard"):
+# One in-process solver shared by the wildcard and free-hit solves, configured
+# once: parallel branching across cores and a safety time limit per solve
+_SOLVER = highspy.Highs()
+_SOLVER.setOptionValue("output_flag", False)
+_SOLVER.setOptionValue("threads", os.cpu_count())
+_SOLVER.setOptionValue("time_limit", 30.0)
+
+def solve_fpl_team(df_input, mode="wildcard", warm_start=None):
     """
-    Solves for the best FPL team using Linear Programming.
+    Solves for the best FPL team using Integer Programming (HiGHS).
+
+    warm_start: optional {player_id: (squad, starter)} solution from a
+    previous solve, used as the solver's initial incumbent.
+    Returns (results_df, solution) where solution has the same
+    {player_id: (squad, starter)} shape for reuse as a warm start.
     """
-    # Set up dictionary
-    df = df_input.copy()
-    if "player_id" in df.columns:
-        df = df.set_index("player_id")
-    
+    # Slice out only the columns the solver reads instead of copying the
+    # full frame; set_index on the sliced frame leaves df_input untouched
+    solver_cols = ["first_name", "second_name", "team_name", "position",
+                   "now_cost", "total_decayed_points", "expected_points16"]
+    df = df_input[solver_cols]
+    if "player_id" in df_input.columns:
+        df = df.set_index(df_input["player_id"])
+
     ids = df.index.tolist()
-    
+    n = len(ids)
+
     names = (df["first_name"] + " " + df["second_name"]).to_dict()
     teams = df["team_name"].to_dict()
     positions = df["position"].to_dict()
     costs = df["now_cost"].to_dict()
-    
+
     wc_points = df["total_decayed_points"].to_dict()
     fh_points = df["expected_points16"].to_dict()
-    
-    # Initialize Problem
-    prob = pulp.LpProblem(f"FPL_{mode}", pulp.LpMaximize)
+
+    cost_arr = df["now_cost"].to_numpy(dtype=np.float64)
+
+    # Group row positions by team and position in one pass
+    team_to_idx = defaultdict(list)
+    pos_to_idx = defaultdict(list)
+    for j, i in enumerate(ids):
+        team_to_idx[teams[i]].append(j)
+        pos_to_idx[positions[i]].append(j)
 
     # -- Variables --
-    squad_vars = pulp.LpVariable.dicts("Squad", ids, cat="Binary")   # 1 if in 15-man squad
-    starter_vars = pulp.LpVariable.dicts("Starter", ids, cat="Binary") # 1 if in Starting XI
+    # Column layout: x[0:n] = squad (1 if in 15-man squad),
+    #                x[n:2n] = starter (1 if in Starting XI)
+    num_col = 2 * n
+    inf = highspy.kHighsInf
 
     # -- Objective Function --
+    c = np.zeros(num_col)
     if mode == "wildcard":
-        # Wildcard: Maximize Starters + 50% of Bench Points
-        prob += pulp.lpSum([wc_points[i] * starter_vars[i] for i in ids]) + \
-                0.5 * pulp.lpSum([wc_points[i] * (squad_vars[i] - starter_vars[i]) for i in ids])
+        # Wildcard: Starters + 50% of Bench Points = 0.5*squad + 0.5*starter
+        pts = df["total_decayed_points"].to_numpy(dtype=np.float64)
+        c[:n] = 0.5 * pts
+        c[n:] = 0.5 * pts
     else:
         # Free Hit: Maximize Starting XI Points ONLY
-        prob += pulp.lpSum([fh_points[i] * starter_vars[i] for i in ids])
+        c[n:] = df["expected_points16"].to_numpy(dtype=np.float64)
+
+    # -- Constraints (rowwise sparse: columns, values, lower, upper) --
+    rows = []
+    squad_cols = list(range(n))
+    starter_cols = list(range(n, 2 * n))
+    ones = [1.0] * n
 
     # 15 players in a squad and 11 starters
-    prob += pulp.lpSum([squad_vars[i] for i in ids]) == 15
-    prob += pulp.lpSum([starter_vars[i] for i in ids]) == 11
+    rows.append((squad_cols, ones, 15, 15))
+    rows.append((starter_cols, ones, 11, 11))
 
-    for i in ids:
-        prob += starter_vars[i] <= squad_vars[i]
+    # Starters must be in the squad
+    for j in range(n):
+        rows.append(([j, n + j], [-1.0, 1.0], -inf, 0))
 
     # 100 million budget
-    prob += pulp.lpSum([costs[i] * squad_vars[i] for i in ids]) <= 100
+    rows.append((squad_cols, cost_arr.tolist(), -inf, 100))
 
     # Bench has to be at least 18.5 million
     if mode == "wildcard":
-        bench_cost = pulp.lpSum([costs[i] * squad_vars[i] for i in ids]) - \
-                     pulp.lpSum([costs[i] * starter_vars[i] for i in ids])
-        prob += bench_cost >= 18.5
+        rows.append((
+            squad_cols + starter_cols,
+            np.concatenate([cost_arr, -cost_arr]).tolist(),
+            18.5, inf,
+        ))
 
     # A maximum of three players for each team
-    unique_teams = set(teams.values())
-    for t in unique_teams:
-        team_ids = [k for k, v in teams.items() if v == t]
-        prob += pulp.lpSum([squad_vars[i] for i in team_ids]) <= 3
+    for t, t_idx in team_to_idx.items():
+        rows.append((t_idx, [1.0] * len(t_idx), -inf, 3))
 
-    # 2 gk, 5 def, 5 mid, 2 forwards
-    prob += pulp.lpSum([squad_vars[i] for i in ids if positions[i] == "Goalkeeper"]) == 2
-    prob += pulp.lpSum([squad_vars[i] for i in ids if positions[i] == "Defender"]) == 5
-    prob += pulp.lpSum([squad_vars[i] for i in ids if positions[i] == "Midfielder"]) == 5
-    prob += pulp.lpSum([squad_vars[i] for i in ids if positions[i] == "Forward"]) == 3
+    # 2 gk, 5 def, 5 mid, 3 forwards
+    for pos, count in [("Goalkeeper", 2), ("Defender", 5), ("Midfielder", 5), ("Forward", 3)]:
+        p_idx = pos_to_idx[pos]
+        rows.append((p_idx, [1.0] * len(p_idx), count, count))
 
     # 1 starting gk, at least 3 defenders, at least 1 forward starting
-    prob += pulp.lpSum([starter_vars[i] for i in ids if positions[i] == "Goalkeeper"]) == 1
-    prob += pulp.lpSum([starter_vars[i] for i in ids if positions[i] == "Defender"]) >= 3
-    prob += pulp.lpSum([starter_vars[i] for i in ids if positions[i] == "Forward"]) >= 1
+    for pos, lo, hi in [("Goalkeeper", 1, 1), ("Defender", 3, inf), ("Forward", 1, inf)]:
+        p_idx = [n + j for j in pos_to_idx[pos]]
+        rows.append((p_idx, [1.0] * len(p_idx), lo, hi))
+
+    # -- Assemble the model --
+    lp = highspy.HighsLp()
+    lp.model_name_ = f"FPL_{mode}"
+    lp.num_col_ = num_col
+    lp.num_row_ = len(rows)
+    lp.sense_ = highspy.ObjSense.kMaximize
+    lp.col_cost_ = c
+    lp.col_lower_ = np.zeros(num_col)
+    lp.col_upper_ = np.ones(num_col)
+    lp.integrality_ = [highspy.HighsVarType.kInteger] * num_col
+    lp.row_lower_ = np.array([r[2] for r in rows], dtype=np.float64)
+    lp.row_upper_ = np.array([r[3] for r in rows], dtype=np.float64)
+
+    start = np.zeros(len(rows) + 1, dtype=np.int32)
+    np.cumsum([len(r[0]) for r in rows], out=start[1:])
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.start_ = start
+    lp.a_matrix_.index_ = np.concatenate([r[0] for r in rows]).astype(np.int32)
+    lp.a_matrix_.value_ = np.concatenate([r[1] for r in rows])
 
     # -- Solve --
     print(f"Solving for {mode}...")
-    solver = pulp.PULP_CBC_CMD(msg=False)
-    prob.solve(solver)
+    solver = _SOLVER
+    solver.clearModel()
+    solver.passModel(lp)
+
+    # Seed the solver with a known feasible solution so branch-and-bound
+    # starts with an incumbent to prune against
+    if warm_start is not None:
+        initial = highspy.HighsSolution()
+        values = np.zeros(num_col)
+        for j, i in enumerate(ids):
+            sq, st = warm_start.get(i, (0, 0))
+            values[j] = sq
+            values[n + j] = st
+        initial.col_value = values
+        solver.setSolution(initial)
 
-    if pulp.LpStatus[prob.status] != 'Optimal':
+    solver.run()
+
+    if solver.getModelStatus() != highspy.HighsModelStatus.kOptimal:
         print("No optimal solution found.")
-        return None
+        return None, None
+
+    col_value = np.rint(solver.getSolution().col_value).astype(int)
+    squad_vals = col_value[:n]
+    starter_vals = col_value[n:]
 
     # -- Format Results --
+    solution = {i: (squad_vals[j], starter_vals[j]) for j, i in enumerate(ids)}
     selected = []
-    for i in ids:
-        if pulp.value(squad_vars[i]) == 1:
-            role = "Starter" if pulp.value(starter_vars[i]) == 1 else "Bench"
-            selected.append({
-                "Role": role,
-                "Name": names[i],
-                "Team": teams[i],
-                "Pos": positions[i],
-                "Cost": costs[i],
-                "Points": fh_points[i] if mode == "free_hit" else wc_points[i]
-            })
+    for j in np.flatnonzero(squad_vals == 1):
+        i = ids[j]
+        role = "Starter" if starter_vals[j] == 1 else "Bench"
+        selected.append({
+            "Role": role,
+            "Name": names[i],
+            "Team": teams[i],
+            "Pos": positions[i],
+            "Cost": costs[i],
+            "Points": fh_points[i] if mode == "free_hit" else wc_points[i]
+        })
 
     res_df = pd.DataFrame(selected)
-    
+
     # Sorting for readable output
     role_map = {"Starter": 0, "Bench": 1}
     pos_map = {"Goalkeeper": 0, "Defender": 1, "Midfielder": 2, "Forward": 3}
@@ -101,4 +176,4 @@ def solve_fpl_team(df_input, mode="wildcard"):
     res_df["p_sort"] = res_df["Pos"].map(pos_map)
     res_df = res_df.sort_values(by=["r_sort", "p_sort"]).drop(columns=["r_sort", "p_sort"])
 
-    return res_df
\ No newline at end of file
+    return res_df, solution
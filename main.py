@@ -51,8 +51,9 @@ def print_projections(df, sort_by="total_decayed_points", n=None, gw=None, posit
         sort_col = "total_decayed_points"
         display_name = "Decayed Total"
 
-    # 2. Filter by Position (Optional)
-    subset = df.copy()
+    # 2. Filter by Position (Optional) — filtering/sorting below never
+    # mutates, so no defensive copy of the full frame is needed
+    subset = df
     if position:
         pos_map = {
             "g": "Goalkeeper", "gk": "Goalkeeper", "goalkeeper": "Goalkeeper",
@@ -130,8 +131,11 @@ def main():
     # Load the data for past seasons for each player
     past_data = fpl_data.get_player_history(players_full['player_id'])
     
-    # Merge the history dataset with the current season dataset
-    players_full = players_full.merge(past_data, left_on="player_id", right_index=True, how="left")
+    # Map the history columns onto the current season dataset; past_data has
+    # one row per player, so map is much cheaper than a full merge
+    assert past_data.index.is_unique
+    for col in past_data.columns:
+        players_full[col] = players_full["player_id"].map(past_data[col])
     players_full = fpl_model.fill_missing_history_with_current(players_full)
 
     # Run projections for the next 6 gameweeks
@@ -158,7 +162,7 @@ def main():
         print_top_players(players_full, n=args.top)
 
         # Optimization Solvers
-        wc_team = fpl_solver.solve_fpl_team(players_full, mode="wildcard")
+        wc_team, wc_solution = fpl_solver.solve_fpl_team(players_full, mode="wildcard")
         print("\n############################################")
         print("   OPTIMIZED WILDCARD TEAM (GW 16-21)   ")
         print("   Obj: Max Decayed Pts | Bench Cost >= 18.5m ")
@@ -168,7 +172,8 @@ def main():
             print(f"Projected Points (Decayed): {wc_team['Points'].sum():.1f}")
             print(wc_team.to_string(index=False))
 
-        fh_team = fpl_solver.solve_fpl_team(players_full, mode="free_hit")
+        # Wildcard squad is feasible for the free hit too, so reuse it as a warm start
+        fh_team, _ = fpl_solver.solve_fpl_team(players_full, mode="free_hit", warm_start=wc_solution)
         print("\n\n############################################")
         print("      OPTIMIZED FREE HIT TEAM (GW 16)       ")
         print("      Obj: Max GW16 Pts | No Bench Limit    ")